@@ -1,5 +1,6 @@
 import time
-from threading import Event
+from operator import index
+from threading import Condition, Event, Thread
 from time import sleep
 
 import serial
@@ -9,7 +10,7 @@ from ovos_utils.enclosure.mark1.faceplate.icons import MusicIcon, WarningIcon, S
 from ovos_utils.log import LOG
 from ovos_utils.network_utils import is_connected
 
-from ovos_PHAL_plugin_mk1.arduino import EnclosureReader, EnclosureWriter
+from ovos_PHAL_plugin_mk1.arduino import EnclosureIO, EnclosureReader, EnclosureWriter
 from ovos_plugin_manager.phal import PHALPlugin
 
 
@@ -21,6 +22,20 @@ from ovos_plugin_manager.phal import PHALPlugin
 # The Arduino can also send back notifications in response to either
 # pressing or turning a rotary encoder.
 
+# encoded "mouth.viseme=" commands indexed by viseme code (0-6)
+_VISEME_FRAMES = tuple(b"mouth.viseme=%d" % code for code in range(7))
+
+
+def _viseme_frame(code):
+    """ the encoded command for a viseme code, None if the code is invalid """
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        return None
+    if 0 <= code < len(_VISEME_FRAMES):
+        return _VISEME_FRAMES[code]
+    return None
+
 
 class MycroftMark1Validator:
     @staticmethod
@@ -48,21 +63,65 @@ class MycroftMark1(PHALPlugin):
        """
     validator = MycroftMark1Validator
 
+    # serial command templates, formatted straight into the bytes sent
+    _TMPL_COLOR = b"eyes.color=%d"
+    _TMPL_LEVEL = b"eyes.level=%s"
+    _TMPL_FADE = b"eyes.fade=%d,%d,%d"
+    _TMPL_FILL = b"eyes.fill=%d"
+    _TMPL_BLINK = b"eyes.blink=%s"
+    _TMPL_LOOK = b"eyes.look=%s"
+    _TMPL_SPIN = b"eyes.spin=%s"
+    _TMPL_VOLUME = b"eyes.volume=%s"
+    _TMPL_PIXEL = b"eyes.set=%d,%d"
+    _TMPL_PIXELS = b"eyes.setrange="
+    _TMPL_SYSTEM_BLINK = b"system.blink=%s"
+    _TMPL_TEXT = b"mouth.text=%s"
+    _TMPL_ICON = b"mouth.icon=x=%s,y=%s,cP=%d,%s"
+    _TMPL_WEATHER = b"weather.display=%s,%s"
+
+    _weather_icons = None  # see _get_weather_icons
+
     def __init__(self, bus=None, config=None):
         super().__init__(bus=bus, name="ovos-PHAL-plugin-mk1", config=config)
         self.stopped = Event()
         self.config = config or {
             "port": "/dev/ttyAMA0",
             "rate": 9600,
-            "timeout": 5.0
+            "timeout": 5.0,
+            "coalesce": False,
+            "min_interval": 0,
+            "setrange": False,
+            "priority": None,
+            "cpus": None,
+            "binary": False,
+            "single_thread": True,
+            "fade": False
         }
         self.__init_serial()
-        self.reader = EnclosureReader(self.serial, self.bus, self.handle_button_press)
-        self.writer = EnclosureWriter(self.serial, self.bus)
+        priority = self.config.get("priority")
+        cpus = self.config.get("cpus")
+        writer_kwargs = {"coalesce": self.config.get("coalesce", False),
+                         "min_interval": self.config.get("min_interval", 0),
+                         "priority": priority,
+                         "cpus": cpus,
+                         "binary": self.config.get("binary", False)}
+        if self.config.get("single_thread", True) and EnclosureIO.supports(self.serial):
+            # a single thread reads and writes the serial port
+            self.reader = self.writer = EnclosureIO(self.serial, self.bus,
+                                                    self.handle_button_press,
+                                                    **writer_kwargs)
+        else:
+            self.reader = EnclosureReader(self.serial, self.bus, self.handle_button_press,
+                                          priority=priority, cpus=cpus)
+            self.writer = EnclosureWriter(self.serial, self.bus, **writer_kwargs)
 
         self._num_pixels = 12 * 2
-        self._current_rgb = [(255, 255, 255) for i in range(self._num_pixels)]
-        self.showing_visemes = False
+        # one preallocated list, recolors overwrite it in place
+        self._current_rgb = [(255, 255, 255)] * self._num_pixels
+        self._pixel_dirty = {}
+        self._pixel_cond = Condition()  # guards _pixel_dirty
+        Thread(target=self._pixel_flush_loop, daemon=True).start()
+        self._eyes_state = {}  # see _write_eyes_state
         self.speaking = False
         self.listening = False
 
@@ -77,12 +136,14 @@ class MycroftMark1(PHALPlugin):
         self.bus.on("system.factory.reset.ping", self.handle_register_factory_reset_handler)
         self.bus.on("system.factory.reset.phal", self.handle_factory_reset)
 
-        self.bus.on("mycroft.internet.connected", self.on_display_reset)
-        self.bus.on("mycroft.stop", self.on_display_reset)
+        # bound once, skips the handler attribute lookups on every message
+        reset_mouth = self._bind_command(b"mouth.reset")
+        self.bus.on("mycroft.internet.connected", reset_mouth)
+        self.bus.on("mycroft.stop", self.handle_stop)
         self.bus.on("ovos.common_play.play", self.on_music)
-        self.bus.on("ovos.common_play.stop", self.on_display_reset)
+        self.bus.on("ovos.common_play.stop", reset_mouth)
         self.bus.on("mycroft.audio.service.play", self.on_music)
-        self.bus.on("mycroft.audio.service.stop", self.on_display_reset)
+        self.bus.on("mycroft.audio.service.stop", reset_mouth)
 
         self.bus.emit(Message("system.factory.reset.register",
                               {"skill_id": "ovos-phal-plugin-mk1"}))
@@ -92,9 +153,9 @@ class MycroftMark1(PHALPlugin):
         r = 0
         g = 0
         b = 255
-        color = (r * 65536) + (g * 256) + b
-        self._current_rgb = [(r, g, b) for i in range(self._num_pixels)]
-        self.writer.write("eyes.color=" + str(color))
+        color = (r << 16) | (g << 8) | b
+        self._current_rgb[:] = [(r, g, b)] * self._num_pixels
+        self._write_eyes_state("color", self._TMPL_COLOR % color)
 
         # narrow eyes while we do system checks
         self.on_eyes_narrow()
@@ -143,9 +204,42 @@ class MycroftMark1(PHALPlugin):
             LOG.exception(f"Impossible to connect to serial: {self.port}")
             raise
 
+    def shutdown(self):
+        self.stopped.set()
+        with self._pixel_cond:
+            self._pixel_cond.notify()  # ends _pixel_flush_loop
+        # with EnclosureIO reader and writer are the same thread
+        self.reader.stop()
+        self.writer.stop()
+        super().shutdown()
+
+    def _bind_command(self, command):
+        """ build a bus handler that only queues a fixed serial command,
+        the writer and the command are captured as closure defaults """
+        def handler(message=None, _write=self.writer.write, _command=command):
+            _write(_command)
+        return handler
+
+    def _write_eyes_state(self, key, command):
+        """ queue a command that sets the eyes "color" or "pose" (look or
+        reset), skipped when it is the last command queued for that key """
+        self._flush_pixels()  # keep buffered pixels ordered before it
+        if self._eyes_state.get(key) == command:
+            return
+        if command == b"eyes.reset":
+            self._eyes_state.clear()  # a reset may also restore the color
+        self._eyes_state[key] = command
+        self.writer.write(command)
+
+    def _eyes_changed(self):
+        """ send the buffered pixels and forget the tracked eyes state,
+        called before any other command that changes the eyes """
+        self._flush_pixels()
+        self._eyes_state.clear()
+
     def __reset(self, message=None):
-        self.writer.write("eyes.reset")
-        self.writer.write("mouth.reset")
+        self._write_eyes_state("pose", b"eyes.reset")
+        self.writer.write(b"mouth.reset")
 
     def handle_button_press(self):
         if self.speaking or self.listening:
@@ -164,9 +258,15 @@ class MycroftMark1(PHALPlugin):
         self.bus.emit(message.reply("enclosure.eyes.rgb",
                                     {"pixels": self._current_rgb}))
 
+    def handle_stop(self, message=None):
+        """ interrupt the lip sync of the current utterance """
+        self.writer.cancel_sequence()
+        self.writer.write(b"mouth.reset")
+
     def handle_factory_reset(self, message):
-        self.writer.write("eyes.spin")
-        self.writer.write("mouth.reset")
+        self._eyes_changed()
+        self.writer.write(b"eyes.spin")
+        self.writer.write(b"mouth.reset")
         # TODO re-flash firmware to faceplate
 
     def handle_register_factory_reset_handler(self, message):
@@ -197,12 +297,13 @@ class MycroftMark1(PHALPlugin):
         ''' on wakeup animation
         triggered by "mycroft.awoken"
         '''
-        self.writer.write("eyes.reset")
+        self._eyes_changed()
+        self.writer.write(b"eyes.reset")
         sleep(1)
-        self.writer.write("eyes.blink=b")
+        self.writer.write(b"eyes.blink=b")
         sleep(1)
         # brighten the rest of the way
-        self.writer.write("eyes.level=" + str(self.old_brightness))
+        self.writer.write(self._TMPL_LEVEL % str(self.old_brightness).encode())
 
     def on_sleep(self, message=None):
         ''' on naptime animation
@@ -211,11 +312,18 @@ class MycroftMark1(PHALPlugin):
         # Dim and look downward to 'go to sleep'
         # TODO: Get current brightness from somewhere
         self.old_brightness = 30
-        for i in range(0, (self.old_brightness - 10) // 2):
-            level = self.old_brightness - i * 2
-            self.writer.write("eyes.level=" + str(level))
-            time.sleep(0.15)
-        self.writer.write("eyes.look=d")
+        self._eyes_changed()
+        if self.config.get("fade", False):
+            # the faceplate runs the ramp itself
+            self.writer.write(self._TMPL_FADE % (self.old_brightness, 10, 1500))
+        else:
+            # paced by the writer, the bus thread does not wait for the ramp
+            for i in range(0, (self.old_brightness - 10) // 2):
+                level = self.old_brightness - i * 2
+                self.writer.write(self._TMPL_LEVEL % str(level).encode(),
+                                  droppable=True)
+                self.writer.pause(0.15)
+        self._write_eyes_state("pose", b"eyes.look=d")
 
     def on_reset(self, message=None):
         """The enclosure should restore itself to a started state.
@@ -223,8 +331,8 @@ class MycroftMark1(PHALPlugin):
         and the mouth reset to its default (smile or blank).
         triggered by "enclosure.reset"
         """
-        self.writer.write("eyes.reset")
-        self.writer.write("mouth.reset")
+        self._write_eyes_state("pose", b"eyes.reset")
+        self.writer.write(b"mouth.reset")
 
     # System Events
     def on_no_internet(self, message=None):
@@ -237,19 +345,20 @@ class MycroftMark1(PHALPlugin):
         """The enclosure hardware should reset any CPUs, etc.
         triggered by "enclosure.system.reset"
         """
-        self.writer.write("system.reset")
+        self._eyes_changed()
+        self.writer.write(b"system.reset")
 
     def on_system_mute(self, message=None):
         """Mute (turn off) the system speaker.
         triggered by "enclosure.system.mute"
         """
-        self.writer.write("system.mute")
+        self.writer.write(b"system.mute")
 
     def on_system_unmute(self, message=None):
         """Unmute (turn on) the system speaker.
         triggered by "enclosure.system.unmute"
         """
-        self.writer.write("system.unmute")
+        self.writer.write(b"system.unmute")
 
     def on_system_blink(self, message=None):
         """The 'eyes' should blink the given number of times.
@@ -261,20 +370,22 @@ class MycroftMark1(PHALPlugin):
         times = 1
         if message and message.data:
             times = message.data.get("times", times)
-        self.writer.write("system.blink=" + str(times))
+        self.writer.write(self._TMPL_SYSTEM_BLINK % str(times).encode())
 
     # Eyes messages
     def on_eyes_on(self, message=None):
         """Illuminate or show the eyes.
         triggered by "enclosure.eyes.on"
         """
-        self.writer.write("eyes.on")
+        self._eyes_changed()
+        self.writer.write(b"eyes.on")
 
     def on_eyes_off(self, message=None):
         """Turn off or hide the eyes.
         triggered by "enclosure.eyes.off"
         """
-        self.writer.write("eyes.off")
+        self._eyes_changed()
+        self.writer.write(b"eyes.off")
 
     def on_eyes_fill(self, message=None):
         """triggered by "enclosure.eyes.fill" """
@@ -282,7 +393,8 @@ class MycroftMark1(PHALPlugin):
         if message and message.data:
             percent = int(message.data.get("percentage", 0))
             amount = int(round(23.0 * percent / 100.0))
-        self.writer.write("eyes.fill=" + str(amount))
+        self._eyes_changed()
+        self.writer.write(self._TMPL_FILL % amount)
 
     def on_eyes_blink(self, message=None):
         """Make the eyes blink
@@ -293,13 +405,15 @@ class MycroftMark1(PHALPlugin):
         side = "b"
         if message and message.data:
             side = message.data.get("side", side)
-        self.writer.write("eyes.blink=" + side)
+        self._eyes_changed()
+        self.writer.write(self._TMPL_BLINK % side.encode())
 
     def on_eyes_narrow(self, message=None):
         """Make the eyes look narrow, like a squint
         triggered by "enclosure.eyes.narrow"
         """
-        self.writer.write("eyes.narrow")
+        self._eyes_changed()
+        self.writer.write(b"eyes.narrow")
 
     def on_eyes_look(self, message=None):
         """Make the eyes look to the given side
@@ -313,7 +427,7 @@ class MycroftMark1(PHALPlugin):
         """
         if message and message.data:
             side = message.data.get("side", "")
-            self.writer.write("eyes.look=" + side)
+            self._write_eyes_state("pose", self._TMPL_LOOK % side.encode())
 
     def on_eyes_color(self, message=None):
         """Change the eye color to the given RGB color
@@ -324,13 +438,13 @@ class MycroftMark1(PHALPlugin):
             b (int): 0-255, blue value
         """
         r, g, b = 255, 255, 255
-        if message and message.data:
-            r = int(message.data.get("r", r))
-            g = int(message.data.get("g", g))
-            b = int(message.data.get("b", b))
-        color = (r * 65536) + (g * 256) + b
-        self._current_rgb = [(r, g, b) for i in range(self._num_pixels)]
-        self.writer.write("eyes.color=" + str(color))
+        data = message.data if message else None
+        if data:
+            get = data.get
+            r, g, b = index(get("r", r)), index(get("g", g)), index(get("b", b))
+        color = (r << 16) | (g << 8) | b
+        self._current_rgb[:] = [(r, g, b)] * self._num_pixels
+        self._write_eyes_state("color", self._TMPL_COLOR % color)
 
     def on_eyes_brightness(self, message=None):
         """Set the brightness of the eyes in the display.
@@ -339,15 +453,18 @@ class MycroftMark1(PHALPlugin):
             level (int): 1-30, bigger numbers being brighter
         """
         level = 30
-        if message and message.data:
-            level = message.data.get("level", level)
-        self.writer.write("eyes.level=" + str(level))
+        data = message.data if message else None
+        if data:
+            # formatted as is like before, payloads such as "20" are valid
+            level = data.get("level", level)
+        self._flush_pixels()
+        self.writer.write(self._TMPL_LEVEL % str(level).encode())
 
     def on_eyes_reset(self, message=None):
         """Restore the eyes to their default (ready) state
         triggered by "enclosure.eyes.reset".
         """
-        self.writer.write("eyes.reset")
+        self._write_eyes_state("pose", b"eyes.reset")
 
     def on_eyes_timed_spin(self, message=None):
         """Make the eyes 'roll' for the given time.
@@ -358,7 +475,8 @@ class MycroftMark1(PHALPlugin):
         length = 5000
         if message and message.data:
             length = message.data.get("length", length)
-        self.writer.write("eyes.spin=" + str(length))
+        self._eyes_changed()
+        self.writer.write(self._TMPL_SPIN % str(length or 0).encode())
 
     def on_eyes_volume(self, message=None):
         """Indicate the volume using the eyes
@@ -369,13 +487,15 @@ class MycroftMark1(PHALPlugin):
         volume = 4
         if message and message.data:
             volume = message.data.get("volume", volume)
-        self.writer.write("eyes.volume=" + str(volume))
+        self._eyes_changed()
+        self.writer.write(self._TMPL_VOLUME % str(volume).encode())
 
     def on_eyes_spin(self, message=None):
         """
         triggered by "enclosure.eyes.spin"
         """
-        self.writer.write("eyes.spin")
+        self._eyes_changed()
+        self.writer.write(b"eyes.spin")
 
     def on_eyes_set_pixel(self, message=None):
         """
@@ -383,45 +503,91 @@ class MycroftMark1(PHALPlugin):
         """
         idx = 0
         r, g, b = 255, 255, 255
-        if message and message.data:
-            idx = int(message.data.get("idx", idx))
-            r = int(message.data.get("r", r))
-            g = int(message.data.get("g", g))
-            b = int(message.data.get("b", b))
+        data = message.data if message else None
+        if data:
+            get = data.get
+            idx = index(get("idx", idx))
+            r, g, b = index(get("r", r)), index(get("g", g)), index(get("b", b))
         self._current_rgb[idx] = (r, g, b)
-        color = (r * 65536) + (g * 256) + b
-        self.writer.write("eyes.set=" + str(idx) + "," + str(color))
+        color = (r << 16) | (g << 8) | b
+        self._eyes_state.clear()  # no flush here, that would defeat batching
+        with self._pixel_cond:
+            if not self._pixel_dirty:
+                self._pixel_cond.notify()  # first pixel of a batch
+            self._pixel_dirty[idx] = color
+
+    def _pixel_flush_loop(self):
+        """ send the pixels buffered by on_eyes_set_pixel 10ms after the
+        first one of a batch, one thread for the lifetime of the plugin """
+        with self._pixel_cond:
+            while not self.stopped.is_set():
+                if not self._pixel_dirty:
+                    self._pixel_cond.wait()
+                    continue
+                # collect the rest of the batch, returns early on shutdown
+                self._pixel_cond.wait_for(self.stopped.is_set, 0.01)
+                self._write_pixels()
+
+    def _flush_pixels(self):
+        """ send the pixel updates buffered by on_eyes_set_pixel """
+        with self._pixel_cond:
+            self._write_pixels()
+
+    def _write_pixels(self):
+        """ queue the buffered pixels, called with ``_pixel_cond`` held so
+        a concurrent flush can not queue an eye command before them """
+        dirty = self._pixel_dirty
+        if not dirty:
+            return
+        self._pixel_dirty = {}
+        if not self.config.get("setrange", False):
+            for idx, color in dirty.items():
+                self.writer.write(self._TMPL_PIXEL % (idx, color), droppable=True)
+            return
+        # keep every line under the Arduino's serial buffer input limit
+        pixels = []
+        size = len(self._TMPL_PIXELS)
+        for idx, color in dirty.items():
+            pixel = b"%d,%d" % (idx, color)
+            if pixels and size + len(pixel) > 55:
+                self.writer.write(self._TMPL_PIXELS + b";".join(pixels), droppable=True)
+                pixels = []
+                size = len(self._TMPL_PIXELS)
+            pixels.append(pixel)
+            size += len(pixel) + 1
+        if pixels:
+            self.writer.write(self._TMPL_PIXELS + b";".join(pixels), droppable=True)
 
     # Display (faceplate) messages
     def on_display_reset(self, message=None):
         """Restore the mouth display to normal (blank)
         triggered by "enclosure.mouth.reset" / "recognizer_loop:record_end"
         """
-        self.writer.write("mouth.reset")
+        self.writer.write(b"mouth.reset")
 
     def on_talk(self, message=None):
         """Show a generic 'talking' animation for non-synched speech
         triggered by "enclosure.mouth.talk"
         """
-        self.writer.write("mouth.talk")
+        self.writer.write(b"mouth.talk")
 
     def on_think(self, message=None):
         """Show a 'thinking' image or animation
         triggered by "enclosure.mouth.think"
         """
-        self.writer.write("mouth.think")
+        self.writer.write(b"mouth.think")
 
     def on_listen(self, message=None):
         """Show a 'thinking' image or animation
         triggered by "enclosure.mouth.listen" / "recognizer_loop:record_begin"
         """
-        self.writer.write("mouth.listen")
+        self.writer.write(b"mouth.listen")
 
     def on_smile(self, message=None):
         """Show a 'smile' image or animation
         triggered by "enclosure.mouth.smile"
         """
-        self.writer.write("mouth.smile")
+        self.writer.write(b"mouth.smile")
 
     def on_viseme(self, message=None):
         """Display a viseme mouth shape for synced speech
@@ -438,8 +604,11 @@ class MycroftMark1(PHALPlugin):
                          6 = shape for sounds like 'oy' or 'ao'
         """
         if message and message.data:
-            code = message.data["code"]
-            self.writer.write('mouth.viseme=' + code)
+            frame = _viseme_frame(message.data["code"])
+            if frame is None:
+                LOG.warning("Invalid viseme code: {0}".format(message.data["code"]))
+                return
+            self.writer.write(frame, droppable=True)
 
     def on_viseme_list(self, message=None):
         """ Send mouth visemes as a list in a single message.
@@ -461,15 +630,20 @@ class MycroftMark1(PHALPlugin):
         if message and message.data:
             start = message.data['start']
             visemes = message.data['visemes']
-            self.showing_visemes = True
+            # move the wall clock start of speech to the monotonic clock
+            # once, pacing happens in the writer thread
+            start = time.monotonic() + start - time.time()
+            frames = []
             for code, end in visemes:
-                if not self.showing_visemes:
-                    break
-                if time.time() < start + end:
-                    self.writer.write('mouth.viseme=' + code)
-                    sleep(start + end - time.time())
-            self.writer.write("mouth.reset")
-            self.showing_visemes = False
+                frame = _viseme_frame(code)
+                if frame is None:
+                    # skip the frame instead of losing the whole list
+                    LOG.warning("Invalid viseme code: {0}".format(code))
+                    continue
+                frames.append((frame, start + end))
+            # the reset ends the sequence, without deadline it is never stale
+            frames.append((b"mouth.reset", None))
+            self.writer.write_sequence(frames)
 
     def on_text(self, message=None):
         """Display text (scrolling as needed)
@@ -482,7 +656,7 @@ class MycroftMark1(PHALPlugin):
         text = ""
         if message and message.data:
             text = message.data.get("text", text)
-        self.writer.write("mouth.text=" + text)
+        self.writer.write(self._TMPL_TEXT % text.encode())
 
     def on_display(self, message=None):
         """Display images on faceplate. Currently supports images up to 16x8,
@@ -511,20 +685,17 @@ class MycroftMark1(PHALPlugin):
             clear_previous = message.data.get("clearPrev", clear_previous)
 
         clear_previous = int(str(clear_previous) == "True")
-        clear_previous = "cP=" + str(clear_previous) + ","
-        x_offset = "x=" + str(x_offset) + ","
-        y_offset = "y=" + str(y_offset) + ","
-
-        message = "mouth.icon=" + x_offset + y_offset + clear_previous + code
-        # Check if message exceeds Arduino's serial buffer input limit 64 bytes
+        message = self._TMPL_ICON % (str(x_offset).encode(),
+                                     str(y_offset).encode(),
+                                     clear_previous, code.encode())
+        # Check if message exceeds Arduino's serial buffer input limit 64 bytes,
+        # the limit applies to the encoded bytes, not to the str length
         if len(message) > 60:
-            message1 = message[:31] + "$"
-            message2 = "mouth.icon=$" + message[31:]
-            self.writer.write(message1)
-            sleep(0.25)  # writer bugs out if sending messages too rapidly
-            self.writer.write(message2)
+            self.writer.write(message[:31] + b"$")
+            self.writer.pause(0.25)  # writer bugs out if sending messages too rapidly
+            self.writer.write(b"mouth.icon=$" + message[31:])
         else:
-            sleep(0.1)
+            self.writer.pause(0.1)
             self.writer.write(message)
 
     def on_weather_display(self, message=None):
@@ -545,36 +716,27 @@ class MycroftMark1(PHALPlugin):
             temp (int): the temperature (either C or F, not indicated)
         """
         if message and message.data:
-            # Convert img_code to icon
             img_code = message.data.get("img_code", None)
-            icon = None
-            if img_code == 0:
-                # sunny
-                icon = SunnyIcon(bus=self.bus).encode()
-            elif img_code == 1:
-                # partly cloudy
-                icon = PartlyCloudyIcon(bus=self.bus).encode()
-            elif img_code == 2:
-                # cloudy
-                icon = CloudyIcon(bus=self.bus).encode()
-            elif img_code == 3:
-                # light rain
-                icon = LightRainIcon(bus=self.bus).encode()
-            elif img_code == 4:
-                # raining
-                icon = RainIcon(bus=self.bus).encode()
-            elif img_code == 5:
-                # storming
-                icon = StormIcon(bus=self.bus).encode()
-            elif img_code == 6:
-                # snowing
-                icon = SnowIcon(bus=self.bus).encode()
-            elif img_code == 7:
-                # wind/mist
-                icon = WindIcon(bus=self.bus).encode()
-
             temp = message.data.get("temp", None)
-            if icon is not None and temp is not None:
-                icon = "x=2," + icon
-                msg = "weather.display=" + str(temp) + "," + str(icon)
-                self.writer.write(msg)
+            icons = self._get_weather_icons()
+            # range membership also accepts integral floats such as 1.0,
+            # like the former == comparisons did
+            if img_code in range(len(icons)) and temp is not None:
+                self.writer.write(self._TMPL_WEATHER % (str(temp).encode(),
+                                                        icons[int(img_code)]))
+
+    def _get_weather_icons(self):
+        """ encoded weather icons indexed by img_code, built on first use
+        and shared by all instances """
+        if MycroftMark1._weather_icons is None:
+            MycroftMark1._weather_icons = tuple(
+                b"x=2," + icon(bus=self.bus).encode().encode()
+                for icon in (SunnyIcon,  # 0
+                             PartlyCloudyIcon,  # 1
+                             CloudyIcon,  # 2
+                             LightRainIcon,  # 3
+                             RainIcon,  # 4
+                             StormIcon,  # 5
+                             SnowIcon,  # 6
+                             WindIcon))  # 7
+        return MycroftMark1._weather_icons
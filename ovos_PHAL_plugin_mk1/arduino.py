@@ -11,16 +11,304 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import math
+import os
+import selectors
 import time
-from queue import Queue
-from threading import Thread
+from collections import deque
+from threading import Condition, Event, Lock, Thread, Timer, current_thread
 
 from mycroft_bus_client import Message
 from ovos_utils.log import LOG
 from ovos_utils.signal import check_for_signal
 
+from ovos_PHAL_plugin_mk1.protocol import encode_binary
 
-class EnclosureReader(Thread):
+# longest select of EnclosureIO, a bad timeout can not hang or break it
+_MAX_TIMEOUT = 60.0
+
+
+def _set_thread_priority(priority=None, cpus=None):
+    """ Raise the scheduling priority of the calling thread.
+
+    priority (int): SCHED_FIFO priority (1-99), needs root or CAP_SYS_NICE,
+                    falls back to a nice value of -5 when not permitted
+    cpus (iterable): cpu cores to pin the thread to
+    """
+    if priority:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        except (AttributeError, OSError) as e:
+            LOG.warning(f"Could not set SCHED_FIFO priority: {e}")
+            try:
+                os.nice(-5)
+            except OSError as e:
+                LOG.warning(f"Could not raise thread priority: {e}")
+    if cpus:
+        try:
+            os.sched_setaffinity(0, set(cpus))
+        except (AttributeError, OSError) as e:
+            LOG.warning(f"Could not set cpu affinity: {e}")
+
+
+class _StoppableThread(Thread):
+    """ Thread that runs until ``stop`` is called, the loops check
+    ``_stop_event`` and wait on it instead of sleeping so a stop request
+    is observed immediately """
+
+    def __init__(self):
+        super(_StoppableThread, self).__init__()
+        self._stop_event = Event()
+
+    @property
+    def alive(self):
+        return not self._stop_event.is_set()
+
+    def stop(self):
+        if self._stop_event.is_set():
+            return  # already stopped, the wakeup fds may be closed
+        self._stop_event.set()
+        self._wakeup()
+
+    def _wakeup(self):
+        """ interrupt a blocking wait of the thread """
+
+
+class _LineReader:
+    """ Splits the bytes read from the Arduino into lines and emits the
+    bus messages for the faceplate events, shared by ``EnclosureReader``
+    and ``EnclosureIO`` """
+
+    def _process_lines(self, buf):
+        """ process every complete line in buf, returns the incomplete rest """
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if line:
+                self.process(self._decode(line))
+        return buf
+
+    def _read_available(self, buf):
+        """ read the buffered bytes, or wait for at least one, and process
+        the complete lines """
+        buf.extend(self.serial.read(max(1, self.serial.in_waiting)))
+        return self._process_lines(buf)
+
+    @staticmethod
+    def _decode(data):
+        try:
+            return data.decode()
+        except UnicodeError as e:
+            LOG.warning('Invalid characters in response from '
+                        ' enclosure: {}'.format(repr(e)))
+            return data.decode('utf-8', errors='replace')
+
+    def process(self, data):
+        LOG.info(f"faceplate event: {data}")
+        data = data.strip()
+        handler = self._DISPATCH.get(data)
+        if handler:
+            handler(self)
+        elif data.startswith("Command: system.version"):
+            # This happens in response to the "system.version" message
+            # sent during the construction of Enclosure()
+            self.bus.emit(Message("enclosure.started"))
+
+    def _on_stop(self):
+        if self.button_callback:
+            self.button_callback()
+        else:
+            self.bus.emit(Message("mycroft.stop"))
+
+    def _on_volume_up(self):
+        self.bus.emit(Message("mycroft.volume.increase",
+                              {'play_sound': True}))
+
+    def _on_volume_down(self):
+        self.bus.emit(Message("mycroft.volume.decrease",
+                              {'play_sound': True}))
+
+    def _on_shutdown(self):
+        # Eyes to soft gray on shutdown
+        self.bus.emit(Message("enclosure.eyes.color",
+                              {'r': 70, 'g': 65, 'b': 69}))
+        self.bus.emit(
+            Message("enclosure.eyes.timedspin",
+                    {'length': 12000}))
+        self.bus.emit(Message("enclosure.mouth.reset"))
+        # give the system time to pass the message, without blocking the
+        # thread that has to write the animation with EnclosureIO
+        self._emit_later(Message("system.shutdown"))
+
+    def _on_reboot(self):
+        # Eyes to soft gray on reboot
+        self.bus.emit(Message("enclosure.eyes.color",
+                              {'r': 70, 'g': 65, 'b': 69}))
+        self.bus.emit(Message("enclosure.eyes.spin"))
+        self.bus.emit(Message("enclosure.mouth.reset"))
+        self._emit_later(Message("system.reboot"))  # see _on_shutdown
+
+    def _emit_later(self, message, delay=0.5):
+        Timer(delay, self.bus.emit, (message,)).start()
+
+    def _on_setwifi(self):
+        self.bus.emit(Message("system.wifi.setup"))
+
+    def _on_factory_reset(self):
+        self.bus.emit(Message("system.factory.reset"))  # not in mycroft-core!
+
+    def _on_enable_ssh(self):
+        # This is handled by the wifi client
+        self.bus.emit(Message("system.ssh.enable"))
+
+    def _on_disable_ssh(self):
+        # This is handled by the wifi client
+        self.bus.emit(Message("system.ssh.disable"))
+
+    # faceplate event -> handler, one dict lookup per line read
+    _DISPATCH = {
+        "mycroft.stop": _on_stop,
+        "volume.up": _on_volume_up,
+        "volume.down": _on_volume_down,
+        "unit.shutdown": _on_shutdown,
+        "unit.reboot": _on_reboot,
+        "unit.setwifi": _on_setwifi,
+        "unit.factory-reset": _on_factory_reset,
+        "unit.enable-ssh": _on_enable_ssh,
+        "unit.disable-ssh": _on_disable_ssh
+    }
+
+
+class _CommandQueue:
+    """ Queue of commands waiting to be written to the Arduino, shared by
+    ``EnclosureWriter`` and ``EnclosureIO`` """
+
+    def _init_queue(self, size, coalesce, min_interval, binary):
+        self.coalesce = coalesce
+        self.min_interval = min_interval
+        self.binary = binary
+        self.last_write_ts = 0
+        self.size = size
+        self.commands = deque()  # (command, droppable) pairs
+        self._cond = Condition()  # wraps an RLock, _put may nest in it
+        self._pause_until = 0  # commands wait until then, see ``pause``
+        self._frames = deque()  # pending (command, deadline) frames
+        self._frame_at = 0  # monotonic time the next frame is due, finite
+
+    def _notify(self):
+        """ wake up the thread consuming the queue, called with the lock held """
+        self._cond.notify()
+
+    def _pop_commands(self):
+        """ take the next command or token from the queue, with ``coalesce``
+        every command waiting up to the next token is taken with it.
+        must be called with the lock held """
+        if not self.commands:
+            return []
+        cmd = self.commands.popleft()[0]
+        cmds = [cmd]
+        # tokens are handled on their own
+        if self.coalesce and not isinstance(cmd, tuple):
+            while self.commands and \
+                    not isinstance(self.commands[0][0], tuple):
+                cmds.append(self.commands.popleft()[0])
+        return cmds
+
+    def _next_commands(self):
+        """ return (cmds, timeout), the commands due now or an empty list
+        and the seconds until something may become due (None to wait for
+        a new command). sequence frames are scheduled independently, so
+        other commands keep flowing between frames.
+        must be called with the lock held """
+        while True:
+            now = time.monotonic()
+            write_at = self.last_write_ts + self.min_interval
+            if now < write_at:
+                return [], write_at - now
+            if self._frames and now >= self._frame_at:
+                command, deadline = self._frames.popleft()
+                if deadline is None:
+                    # never stale and not held, the next frame is due now
+                    self._frame_at = now
+                elif now < deadline:
+                    self._frame_at = deadline
+                else:
+                    continue  # stale frames are dropped
+                self.last_write_ts = now
+                return [command], None
+            if now >= self._pause_until:
+                cmds = self._pop_commands()
+                if cmds and isinstance(cmds[0], tuple):
+                    token = cmds[0]
+                    if token[0] == "sleep":
+                        self._pause_until = now + token[1]
+                    elif token[0] == "sequence":
+                        # with frames pending _frame_at stays the deadline
+                        # of the frame on screen, the new ones follow it
+                        if not self._frames:
+                            self._frame_at = now
+                        self._frames.extend(token[1])
+                    continue
+                if cmds:
+                    self.last_write_ts = now
+                    return cmds, None
+            due = []
+            if self._frames:
+                due.append(self._frame_at)
+            if self.commands:
+                due.append(self._pause_until)
+            return [], (max(0, min(due) - now) if due else None)
+
+    def _encode(self, cmds):
+        if self.binary:
+            return b"".join(encode_binary(c) for c in cmds)
+        return b"\n".join(cmds) + b"\n"
+
+    def _put(self, item, droppable=False):
+        with self._cond:
+            if len(self.commands) >= self.size:
+                for idx, (_, old_droppable) in enumerate(self.commands):
+                    if old_droppable:
+                        del self.commands[idx]
+                        break
+            self.commands.append((item, droppable))
+            self._notify()
+
+    def write(self, command, droppable=False):
+        """ queue a command, bytes are sent as is and anything else is
+        encoded from its string representation. droppable commands may be
+        discarded if the writer falls behind """
+        if not isinstance(command, bytes):
+            command = str(command).encode()
+        self._put(command, droppable)
+
+    def pause(self, seconds):
+        """ delay the commands queued after this call by seconds """
+        self._put(("sleep", seconds))
+
+    def write_sequence(self, frames, droppable=False):
+        """ queue a list of (command, deadline) frames, deadlines use
+        time.monotonic(). each command is displayed until its deadline and
+        dropped if the deadline already passed when it is reached, a frame
+        with a deadline of None is never dropped and not held.
+        sequences queued while frames are pending play after them """
+        # an infinite deadline would never let the next frame come due
+        frames = [(c if isinstance(c, bytes) else str(c).encode(),
+                   d if d is None or math.isfinite(d) else None)
+                  for c, d in frames]
+        self._put(("sequence", frames), droppable)
+
+    def cancel_sequence(self):
+        """ drop the pending and queued ``write_sequence`` frames """
+        with self._cond:
+            self._frames.clear()
+            for item in [c for c in self.commands
+                         if isinstance(c[0], tuple) and c[0][0] == "sequence"]:
+                self.commands.remove(item)
+            self._notify()
+
+
+class EnclosureReader(_LineReader, _StoppableThread):
     """
     Reads data from Serial port.
 
@@ -33,90 +321,90 @@ class EnclosureReader(Thread):
         # . Notify all Mycroft Core processes (e.g. skills) to be stopped
 
     Note: A command is identified by a line break
+
+    The thread sleeps in the kernel until the serial port is readable or
+    ``stop`` is called, serial ports without a file descriptor (e.g.
+    ``loop://`` urls) fall back to blocking reads. Either way every read
+    takes all the bytes already buffered by the driver and splits them
+    into lines, instead of ``readline`` reading one byte at a time
+
+    ``priority`` and ``cpus`` optionally raise the scheduling priority of
+    the thread and pin it to the given cores, see ``_set_thread_priority``
     """
 
-    def __init__(self, serial, bus, button_callback=None):
-        super(EnclosureReader, self).__init__(target=self.read)
-        self.alive = True
+    def __init__(self, serial, bus, button_callback=None,
+                 priority=None, cpus=None):
+        super(EnclosureReader, self).__init__()
+        self.priority = priority
+        self.cpus = cpus
         self.daemon = True
         self.serial = serial
         self.bus = bus
         self.button_callback = button_callback
+        # the pipe and selector are only needed with a file descriptor
+        self._shutdown_r = self._shutdown_w = None
+        self._selector = None
+        self._shutdown_lock = Lock()
+        if EnclosureIO.supports(self.serial):
+            self._shutdown_r, self._shutdown_w = os.pipe()
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self._shutdown_r, selectors.EVENT_READ)
+            self._selector.register(self.serial.fileno(), selectors.EVENT_READ)
         self.start()
 
+    def run(self):
+        _set_thread_priority(self.priority, self.cpus)
+        self.read()
+
     def read(self):
-        while self.alive:
+        if self._selector is None:
+            self._read_blocking()
+            return
+        try:
+            self._read_select()
+        finally:
+            self._selector.close()
+
+    def _read_select(self):
+        buf = bytearray()
+        while not self._stop_event.is_set():
             try:
-                data = self.serial.readline()[:-2]
-                if data:
-                    try:
-                        data_str = data.decode()
-                    except UnicodeError as e:
-                        data_str = data.decode('utf-8', errors='replace')
-                        LOG.warning('Invalid characters in response from '
-                                    ' enclosure: {}'.format(repr(e)))
-                    self.process(data_str)
+                for key, _ in self._selector.select():
+                    if key.fileobj == self._shutdown_r:
+                        return
+                buf = self._read_available(buf)
             except Exception as e:
                 LOG.error("Reading error: {0}".format(e))
 
-    def process(self, data):
-        LOG.info(f"faceplate event: {data}")
-
-        if "Command: system.version" in data:
-            # This happens in response to the "system.version" message
-            # sent during the construction of Enclosure()
-            self.bus.emit(Message("enclosure.started"))
+    def _read_blocking(self):
+        buf = bytearray()
+        while not self._stop_event.is_set():
+            try:
+                buf = self._read_available(buf)
+            except Exception as e:
+                LOG.error("Reading error: {0}".format(e))
 
-        if "mycroft.stop" in data:
-            if self.button_callback:
-                self.button_callback()
-            else:
-                self.bus.emit(Message("mycroft.stop"))
-
-        if "volume.up" in data:
-            self.bus.emit(Message("mycroft.volume.increase",
-                                  {'play_sound': True}))
-
-        if "volume.down" in data:
-            self.bus.emit(Message("mycroft.volume.decrease",
-                                  {'play_sound': True}))
-
-        if "unit.shutdown" in data:
-            # Eyes to soft gray on shutdown
-            self.bus.emit(Message("enclosure.eyes.color",
-                                  {'r': 70, 'g': 65, 'b': 69}))
-            self.bus.emit(
-                Message("enclosure.eyes.timedspin",
-                        {'length': 12000}))
-            self.bus.emit(Message("enclosure.mouth.reset"))
-            time.sleep(0.5)  # give the system time to pass the message
-            self.bus.emit(Message("system.shutdown"))
-
-        if "unit.reboot" in data:
-            # Eyes to soft gray on reboot
-            self.bus.emit(Message("enclosure.eyes.color",
-                                  {'r': 70, 'g': 65, 'b': 69}))
-            self.bus.emit(Message("enclosure.eyes.spin"))
-            self.bus.emit(Message("enclosure.mouth.reset"))
-            time.sleep(0.5)  # give the system time to pass the message
-            self.bus.emit(Message("system.reboot"))
-
-        if "unit.setwifi" in data:
-            self.bus.emit(Message("system.wifi.setup"))
-        if "unit.factory-reset" in data:
-            self.bus.emit(Message("system.factory.reset"))  # not in mycroft-core!
-        if "unit.enable-ssh" in data:
-            # This is handled by the wifi client
-            self.bus.emit(Message("system.ssh.enable"))
-        if "unit.disable-ssh" in data:
-            # This is handled by the wifi client
-            self.bus.emit(Message("system.ssh.disable"))
+    def _wakeup(self):
+        with self._shutdown_lock:
+            if self._shutdown_w is not None:
+                os.write(self._shutdown_w, b"\0")
 
     def stop(self):
-        self.alive = False
+        super(EnclosureReader, self).stop()
+        if self._shutdown_w is None:
+            return  # blocking reads, nothing to close
+        if current_thread() is not self:
+            self.join(1)
+        # the pipe is closed here instead of in the thread, holding the
+        # lock so a concurrent _wakeup never writes to a closed fd
+        with self._shutdown_lock:
+            if self._shutdown_w is not None and not self.is_alive():
+                os.close(self._shutdown_r)
+                os.close(self._shutdown_w)
+                self._shutdown_r = self._shutdown_w = None
 
 
-class EnclosureWriter(Thread):
+class EnclosureWriter(_CommandQueue, _StoppableThread):
     """
     Writes data to Serial port.
         # . Enqueues all commands received from Mycroft enclosures
@@ -130,28 +418,171 @@ class EnclosureWriter(Thread):
         # . ``EnclosureWriter`` writes the command to Serial port
 
     Note: A command has to end with a line break
+
+    When ``coalesce`` is enabled every command already waiting in the queue
+    is sent together with the first one in a single serial write, bursts
+    of commands then cost one syscall instead of one per command.
+
+    Pacing happens in this thread so producers never need to sleep,
+    ``min_interval`` enforces a minimum delay between serial writes,
+    ``pause`` delays the commands queued after it and ``write_sequence``
+    queues timed frames that are only valid until their deadline, stale
+    frames are dropped and fresh ones are held on screen until their
+    deadline while other commands keep being written in between
+
+    With ``binary`` enabled commands are sent as COBS framed binary
+    packets, see ``ovos_PHAL_plugin_mk1.protocol``, this requires firmware
+    support
+
+    Producers never block, once ``size`` commands are pending the oldest
+    command queued as ``droppable`` (animation frames) is discarded to
+    make room, state setting commands are never dropped
+
+    ``priority`` and ``cpus`` optionally raise the scheduling priority of
+    the thread and pin it to the given cores, see ``_set_thread_priority``
     """
 
-    def __init__(self, serial, bus, size=16):
-        super(EnclosureWriter, self).__init__(target=self.flush)
-        self.alive = True
+    def __init__(self, serial, bus, size=128, coalesce=False, min_interval=0,
+                 priority=None, cpus=None, binary=False):
+        super(EnclosureWriter, self).__init__()
+        self.priority = priority
+        self.cpus = cpus
         self.daemon = True
         self.serial = serial
         self.bus = bus
-        self.commands = Queue(size)
+        self._init_queue(size, coalesce, min_interval, binary)
         self.start()
 
+    def run(self):
+        _set_thread_priority(self.priority, self.cpus)
+        self.flush()
+
     def flush(self):
-        while self.alive:
+        while not self._stop_event.is_set():
             try:
-                cmd = self.commands.get() + '\n'
-                self.serial.write(cmd.encode())
-                self.commands.task_done()
+                with self._cond:
+                    cmds, timeout = self._next_commands()
+                    if not cmds:
+                        self._cond.wait(timeout)
+                        continue
+                self.serial.write(self._encode(cmds))
             except Exception as e:
                 LOG.error("Writing error: {0}".format(e))
 
-    def write(self, command):
-        self.commands.put(str(command))
+    def _wakeup(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class EnclosureIO(_LineReader, _CommandQueue, _StoppableThread):
+    """
+    Reads and writes the Serial port from a single thread.
+
+    Combines ``EnclosureReader`` and ``EnclosureWriter``, the thread waits
+    in selectors until the serial port is readable, writable while output
+    is pending, a producer queued a command or the next paced command is
+    due, so no second thread and no wakeups between threads are needed.
+
+    Accepts the arguments of both classes, the serial port must provide a
+    file descriptor (``fileno``)
+    """
+
+    def __init__(self, serial, bus, button_callback=None, size=128,
+                 coalesce=False, min_interval=0, priority=None, cpus=None,
+                 binary=False):
+        super(EnclosureIO, self).__init__()
+        self.priority = priority
+        self.cpus = cpus
+        self.daemon = True
+        self.serial = serial
+        self.bus = bus
+        self.button_callback = button_callback
+        self._init_queue(size, coalesce, min_interval, binary)
+        self._fd = self.serial.fileno()
+        self._outbuf = bytearray()
+        self._timeout = None  # seconds until the next paced command is due
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._selector.register(self._fd, selectors.EVENT_READ)
+        self.start()
+
+    @staticmethod
+    def supports(serial):
+        """ True if the serial port has a file descriptor to select on,
+        e.g. ``loop://`` urls raise io.UnsupportedOperation in fileno """
+        try:
+            serial.fileno()
+            return True
+        except Exception:
+            return False
+
+    def run(self):
+        _set_thread_priority(self.priority, self.cpus)
+        try:
+            self._loop()
+        finally:
+            self._selector.close()
+
+    def _loop(self):
+        inbuf = bytearray()
+        while not self._stop_event.is_set():
+            try:
+                self._next_output()
+                events = selectors.EVENT_READ
+                if self._outbuf:
+                    events |= selectors.EVENT_WRITE
+                self._selector.modify(self._fd, events)
+                for key, mask in self._selector.select(self._timeout):
+                    if key.fd == self._wakeup_r:
+                        os.read(self._wakeup_r, 512)
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        inbuf.extend(os.read(self._fd, 512))
+                        inbuf = self._process_lines(inbuf)
+                    if mask & selectors.EVENT_WRITE:
+                        del self._outbuf[:os.write(self._fd, self._outbuf)]
+            except BlockingIOError:
+                pass
+            except Exception as e:
+                LOG.error("Serial IO error: {0}".format(e))
+
+    def _next_output(self):
+        """ move the commands that are due to the output buffer once the
+        previous ones are written, sets ``_timeout`` for the select """
+        self._timeout = None
+        if self._outbuf:
+            return
+        with self._cond:
+            cmds, timeout = self._next_commands()
+        if timeout is not None and not 0 <= timeout <= _MAX_TIMEOUT:
+            # select raises on infinity or nan, a negative one is due now
+            timeout = 0 if timeout < 0 else _MAX_TIMEOUT
+        self._timeout = timeout
+        if cmds:
+            self._outbuf += self._encode(cmds)
+
+    def _notify(self):
+        if self._stop_event.is_set():
+            return  # nobody is listening, the pipe may be closed
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except BlockingIOError:
+            pass  # a wakeup is already pending
 
     def stop(self):
-        self.alive = False
+        super(EnclosureIO, self).stop()
+        if current_thread() is not self:
+            self.join(1)
+        # the pipe is closed here instead of in the thread, holding the
+        # lock so a concurrent _put never writes to a closed fd
+        with self._cond:
+            if self._wakeup_w is not None and not self.is_alive():
+                os.close(self._wakeup_r)
+                os.close(self._wakeup_w)
+                self._wakeup_r = self._wakeup_w = None
@@ -0,0 +1,82 @@
+"""
+Framed binary encoding of the Pi -> Arduino serial protocol.
+
+Every command becomes one frame, an opcode byte followed by packed
+arguments, COBS encoded and terminated by a 0x00 byte so the Arduino can
+resync on the next zero after a corrupted frame.
+
+Commands without a dedicated opcode are sent as ``OP_COMMAND`` followed
+by the usual ASCII command, see protocols.txt for the frame layouts.
+
+Note: requires firmware support, the stock firmware only understands the
+newline terminated ASCII protocol
+"""
+import struct
+
+OP_COMMAND = 0
+OP_RESET_EYES = 1
+OP_SETPIXEL = 2
+OP_LEVEL = 3
+OP_VISEME = 4
+OP_COLOR = 5
+OP_RESET_MOUTH = 6
+
+
+def _rgb(color):
+    return (color >> 16) & 255, (color >> 8) & 255, color & 255
+
+
+def _pack_setpixel(args):
+    idx, color = args.split(b",")
+    return struct.pack("!BBBBB", OP_SETPIXEL, int(idx), *_rgb(int(color)))
+
+
+def _pack_color(args):
+    return struct.pack("!BBBB", OP_COLOR, *_rgb(int(args)))
+
+
+def _pack_level(args):
+    return struct.pack("!BB", OP_LEVEL, int(args))
+
+
+def _pack_viseme(args):
+    return struct.pack("!BB", OP_VISEME, int(args))
+
+
+# ASCII command name -> packer of the arguments after "="
+_PACKERS = {
+    b"eyes.reset": lambda args: struct.pack("!B", OP_RESET_EYES),
+    b"eyes.set": _pack_setpixel,
+    b"eyes.level": _pack_level,
+    b"eyes.color": _pack_color,
+    b"mouth.viseme": _pack_viseme,
+    b"mouth.reset": lambda args: struct.pack("!B", OP_RESET_MOUTH)
+}
+
+
+def cobs_encode(data):
+    """ Consistent Overhead Byte Stuffing, the result contains no 0x00 """
+    out = bytearray()
+    for block in bytes(data).split(b"\0"):
+        while len(block) >= 254:
+            out.append(255)
+            out += block[:254]
+            block = block[254:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def encode_binary(command):
+    """ Encode an ASCII command (bytes, without line break) as a frame """
+    name, _, args = command.partition(b"=")
+    packer = _PACKERS.get(name)
+    payload = None
+    if packer:
+        try:
+            payload = packer(args)
+        except (ValueError, struct.error):
+            payload = None  # out of range, send it as a plain command
+    if payload is None:
+        payload = struct.pack("!B", OP_COMMAND) + command
+    return cobs_encode(payload) + b"\0"
@@ -0,0 +1,91 @@
+import unittest
+
+from ovos_PHAL_plugin_mk1.protocol import OP_COMMAND, OP_COLOR, OP_LEVEL, \
+    OP_RESET_EYES, OP_RESET_MOUTH, OP_SETPIXEL, OP_VISEME, cobs_encode, \
+    encode_binary
+
+
+class TestCobs(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(cobs_encode(b""), b"\x01")
+
+    def test_zeros(self):
+        self.assertEqual(cobs_encode(b"\0"), b"\x01\x01")
+        self.assertEqual(cobs_encode(b"\0\0"), b"\x01\x01\x01")
+
+    def test_no_zero_in_output(self):
+        data = bytes(range(256)) * 3
+        self.assertNotIn(b"\0", cobs_encode(data))
+
+    def test_protocols_example(self):
+        # note 4 of protocols.txt
+        self.assertEqual(cobs_encode(bytes.fromhex("0205FFFF00")),
+                         bytes.fromhex("050205FFFF01"))
+
+    def test_254_byte_block(self):
+        data = b"a" * 254
+        encoded = cobs_encode(data)
+        self.assertEqual(len(encoded), 256)
+        self.assertEqual(encoded[0], 0xFF)
+        self.assertEqual(encoded[1:255], data)
+        self.assertEqual(encoded[255:], b"\x01")
+
+    def test_253_byte_block(self):
+        data = b"a" * 253
+        self.assertEqual(cobs_encode(data), b"\xfe" + data)
+
+    def test_long_block(self):
+        data = b"a" * 300
+        encoded = cobs_encode(data)
+        self.assertEqual(encoded[0], 0xFF)
+        self.assertEqual(encoded[1:255], data[:254])
+        self.assertEqual(encoded[255], 47)
+        self.assertEqual(encoded[256:], data[254:])
+
+
+class TestEncodeBinary(unittest.TestCase):
+    def frame(self, payload):
+        return cobs_encode(payload) + b"\0"
+
+    def test_reset_eyes(self):
+        self.assertEqual(encode_binary(b"eyes.reset"),
+                         self.frame(bytes([OP_RESET_EYES])))
+
+    def test_set_pixel(self):
+        # the protocols.txt example, pixel 5 set to yellow
+        self.assertEqual(encode_binary(b"eyes.set=5,16776960"),
+                         bytes.fromhex("050205FFFF0100"))
+        self.assertEqual(encode_binary(b"eyes.set=1,%d" % 0x102030),
+                         self.frame(bytes([OP_SETPIXEL, 1, 0x10, 0x20, 0x30])))
+
+    def test_level(self):
+        self.assertEqual(encode_binary(b"eyes.level=30"),
+                         self.frame(bytes([OP_LEVEL, 30])))
+
+    def test_color(self):
+        self.assertEqual(encode_binary(b"eyes.color=%d" % 0xFF00FF),
+                         self.frame(bytes([OP_COLOR, 0xFF, 0, 0xFF])))
+
+    def test_viseme(self):
+        self.assertEqual(encode_binary(b"mouth.viseme=3"),
+                         self.frame(bytes([OP_VISEME, 3])))
+
+    def test_reset_mouth(self):
+        self.assertEqual(encode_binary(b"mouth.reset"),
+                         self.frame(bytes([OP_RESET_MOUTH])))
+
+    def test_unknown_command(self):
+        command = b"mouth.text=hello"
+        self.assertEqual(encode_binary(command),
+                         self.frame(bytes([OP_COMMAND]) + command))
+
+    def test_out_of_range_fallback(self):
+        for command in (b"eyes.set=300,1", b"eyes.level=999",
+                        b"mouth.viseme=-1"):
+            self.assertEqual(encode_binary(command),
+                             self.frame(bytes([OP_COMMAND]) + command))
+
+    def test_malformed_fallback(self):
+        for command in (b"eyes.set=5", b"eyes.color=red"):
+            self.assertEqual(encode_binary(command),
+                             self.frame(bytes([OP_COMMAND]) + command))
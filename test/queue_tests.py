@@ -0,0 +1,140 @@
+import math
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from ovos_PHAL_plugin_mk1.arduino import _CommandQueue
+
+
+class Queue(_CommandQueue):
+    def __init__(self, coalesce=False, min_interval=0):
+        self._init_queue(128, coalesce, min_interval, False)
+
+
+class TestNextCommands(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        clock = SimpleNamespace(monotonic=lambda: self.now)
+        patcher = patch("ovos_PHAL_plugin_mk1.arduino.time", clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def next(self, queue):
+        with queue._cond:
+            cmds, timeout = queue._next_commands()
+        if timeout is not None:
+            self.assertTrue(math.isfinite(timeout))
+            self.assertGreaterEqual(timeout, 0)
+        return cmds, timeout
+
+    def test_empty(self):
+        self.assertEqual(self.next(Queue()), ([], None))
+
+    def test_coalesce(self):
+        queue = Queue(coalesce=True)
+        queue.write(b"a")
+        queue.write("b")
+        self.assertEqual(self.next(queue), ([b"a", b"b"], None))
+
+    def test_min_interval(self):
+        queue = Queue(min_interval=0.1)
+        queue.write(b"a")
+        queue.write(b"b")
+        self.assertEqual(self.next(queue), ([b"a"], None))
+        cmds, timeout = self.next(queue)
+        self.assertEqual(cmds, [])
+        self.assertAlmostEqual(timeout, 0.1)
+        self.now += 0.1
+        self.assertEqual(self.next(queue), ([b"b"], None))
+
+    def test_pause(self):
+        queue = Queue()
+        queue.write(b"a")
+        queue.pause(1)
+        queue.write(b"b")
+        self.assertEqual(self.next(queue), ([b"a"], None))
+        cmds, timeout = self.next(queue)
+        self.assertEqual(cmds, [])
+        self.assertAlmostEqual(timeout, 1)
+        self.now += 1
+        self.assertEqual(self.next(queue), ([b"b"], None))
+
+    def test_sequence(self):
+        queue = Queue()
+        queue.write_sequence([(b"v0", self.now - 1),  # stale, dropped
+                              (b"v1", self.now + 1),
+                              (b"v2", self.now + 2),
+                              (b"reset", None)])
+        self.assertEqual(self.next(queue), ([b"v1"], None))
+        cmds, timeout = self.next(queue)
+        self.assertEqual(cmds, [])
+        self.assertAlmostEqual(timeout, 1)
+        self.now += 1
+        self.assertEqual(self.next(queue), ([b"v2"], None))
+        # the reset is never stale
+        self.now += 5
+        self.assertEqual(self.next(queue), ([b"reset"], None))
+        self.assertEqual(self.next(queue), ([], None))
+
+    def test_commands_between_frames(self):
+        queue = Queue()
+        queue.write_sequence([(b"v1", self.now + 1), (b"reset", None)])
+        self.assertEqual(self.next(queue), ([b"v1"], None))
+        queue.write(b"blink")
+        self.assertEqual(self.next(queue), ([b"blink"], None))
+        self.now += 1
+        self.assertEqual(self.next(queue), ([b"reset"], None))
+
+    def test_pause_does_not_delay_frames(self):
+        queue = Queue()
+        queue.write_sequence([(b"v1", self.now + 1), (b"v2", self.now + 2)])
+        queue.pause(5)
+        queue.write(b"b")
+        self.assertEqual(self.next(queue), ([b"v1"], None))
+        self.now += 1
+        self.assertEqual(self.next(queue), ([b"v2"], None))
+        # the pause starts once it is taken from the queue
+        cmds, timeout = self.next(queue)
+        self.assertEqual(cmds, [])
+        self.assertAlmostEqual(timeout, 5)
+        self.now += 5
+        self.assertEqual(self.next(queue), ([b"b"], None))
+
+    def test_overlapping_sequences(self):
+        queue = Queue()
+        queue.write_sequence([(b"a1", self.now + 1), (b"reset", None)])
+        self.assertEqual(self.next(queue), ([b"a1"], None))
+        # queued before the first sequence finished
+        queue.write_sequence([(b"b1", self.now + 2), (b"b2", self.now + 3),
+                              (b"reset", None)])
+        cmds, timeout = self.next(queue)
+        self.assertEqual(cmds, [])
+        self.assertAlmostEqual(timeout, 1)
+        self.now += 1
+        self.assertEqual(self.next(queue), ([b"reset"], None))
+        self.assertEqual(self.next(queue), ([b"b1"], None))
+        self.now += 1
+        self.assertEqual(self.next(queue), ([b"b2"], None))
+        self.now += 1
+        self.assertEqual(self.next(queue), ([b"reset"], None))
+        # later sequences are not stuck behind the previous ones
+        queue.write_sequence([(b"c1", self.now + 1)])
+        self.assertEqual(self.next(queue), ([b"c1"], None))
+
+    def test_infinite_deadline(self):
+        queue = Queue()
+        queue.write_sequence([(b"a1", float("inf")), (b"a2", self.now + 1)])
+        self.assertEqual(self.next(queue), ([b"a1"], None))
+        self.assertEqual(self.next(queue), ([b"a2"], None))
+
+    def test_cancel_sequence(self):
+        queue = Queue()
+        queue.write_sequence([(b"a1", self.now + 1), (b"a2", self.now + 2)])
+        self.assertEqual(self.next(queue), ([b"a1"], None))
+        queue.write_sequence([(b"b1", self.now + 3)])
+        queue.write(b"reset")
+        queue.cancel_sequence()
+        self.assertEqual(self.next(queue), ([b"reset"], None))
+        self.assertEqual(self.next(queue), ([], None))
+        queue.write_sequence([(b"c1", self.now + 1)])
+        self.assertEqual(self.next(queue), ([b"c1"], None))